@@ -1,4 +1,4 @@
-from typing import Any, Text, Dict, List
+from typing import Any, Text, Dict, List, Optional
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet, FollowupAction, ConversationPaused
@@ -7,10 +7,86 @@ import sys
 import os
 import re
 import random
+import asyncio
+import functools
+import logging
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.ollama_integration import LlamaIntegration
+from models.batched_integration import BatchedLlamaIntegration
+from models.model_router import ModelRouter
+
+def create_llama_integration(model_name: Optional[str] = None, max_tokens: Optional[int] = None,
+                             host: Optional[str] = None, port: Optional[int] = None) -> LlamaIntegration:
+    """
+    Crea el cliente del modelo según la variable de entorno SPUTNIK_LLM_BACKEND:
+    "ollama" (por defecto) o "batched" para un servidor compatible con OpenAI con batching.
+    host y port permiten apuntar a un servidor distinto del configurado por defecto.
+    Si no se indica max_tokens se usa SPUTNIK_MAX_TOKENS; sin ella, Ollama no limita la
+    respuesta y el backend por lotes usa 200 tokens
+    """
+    backend = os.getenv("SPUTNIK_LLM_BACKEND", "ollama")
+    model_name = model_name or os.getenv("SPUTNIK_LLM_MODEL", "llama3.1")
+    if max_tokens is None and os.getenv("SPUTNIK_MAX_TOKENS"):
+        max_tokens = int(os.getenv("SPUTNIK_MAX_TOKENS"))
+
+    if backend == "batched":
+        return BatchedLlamaIntegration(
+            host=host or os.getenv("SPUTNIK_LLM_HOST", "http://localhost"),
+            port=port or int(os.getenv("SPUTNIK_LLM_PORT", "8080")),
+            model_name=model_name,
+            max_tokens=max_tokens or 200,
+            batch_window_ms=float(os.getenv("SPUTNIK_BATCH_WINDOW_MS", "5")),
+            max_batch_size=int(os.getenv("SPUTNIK_MAX_BATCH_SIZE", "8"))
+        )
+
+    endpoint = {}
+    if host:
+        endpoint["host"] = host
+    if port:
+        endpoint["port"] = port
+    return LlamaIntegration(model_name=model_name, max_tokens=max_tokens, **endpoint)
+
+_model_router = None
+
+def get_model_router() -> Optional[ModelRouter]:
+    """
+    Devuelve el router de modelos compartido por todas las acciones, o None si el
+    enrutado no está activado (SPUTNIK_MODEL_ROUTING=true)
+    """
+    global _model_router
+
+    if os.getenv("SPUTNIK_MODEL_ROUTING", "false").lower() != "true":
+        return None
+
+    if _model_router is None:
+        # Servidor propio para la ruta ligera (opcional). llama-server sirve un único modelo e
+        # ignora el campo "model", así que con el backend por lotes el modelo ligero necesita su propio servidor
+        light_endpoint = {}
+        if os.getenv("SPUTNIK_LIGHT_LLM_HOST"):
+            light_endpoint["host"] = os.getenv("SPUTNIK_LIGHT_LLM_HOST")
+        if os.getenv("SPUTNIK_LIGHT_LLM_PORT"):
+            light_endpoint["port"] = int(os.getenv("SPUTNIK_LIGHT_LLM_PORT"))
+
+        if os.getenv("SPUTNIK_LLM_BACKEND", "ollama") == "batched" and not light_endpoint:
+            logging.getLogger(__name__).warning(
+                "Enrutado de modelos con el backend por lotes sin SPUTNIK_LIGHT_LLM_HOST/SPUTNIK_LIGHT_LLM_PORT: "
+                "la ruta ligera usará el mismo servidor que el modelo completo y solo cambiará su límite de tokens"
+            )
+
+        _model_router = ModelRouter(
+            integration_factory=create_llama_integration,
+            light_model=os.getenv("SPUTNIK_LIGHT_MODEL", "llama3.2:3b"),
+            light_endpoint=light_endpoint,
+            full_model=os.getenv("SPUTNIK_LLM_MODEL", "llama3.1"),
+            light_max_depth=float(os.getenv("SPUTNIK_LIGHT_MAX_DEPTH", "3")),
+            deep_min_depth=float(os.getenv("SPUTNIK_DEEP_MIN_DEPTH", "7")),
+            metrics_path=os.getenv("SPUTNIK_ROUTER_METRICS_PATH"),
+            metrics_interval_s=float(os.getenv("SPUTNIK_ROUTER_METRICS_INTERVAL", "5"))
+        )
+
+    return _model_router
 
 class ObjectiveManager:
     """
@@ -84,13 +160,14 @@ class LlamaActionAdapter(Action):
     def __init__(self, action_name=None, response_template=None):
         self.action_name = action_name
         self.response_template = response_template
-        self.llama_integration = LlamaIntegration()
+        self.llama_integration = create_llama_integration()
+        self.model_router = get_model_router()
         self.objective_manager = ObjectiveManager()
     
     def name(self) -> Text:
         return self.action_name
     
-    def run(self, dispatcher: CollectingDispatcher,
+    async def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
@@ -115,8 +192,16 @@ class LlamaActionAdapter(Action):
         context = self.build_conversation_context(tracker)
         prompt = self.create_prompt(intent, entities, user_message, tracker)
         
-        # Generar y enviar respuesta
-        llama_response = self.llama_integration.generate_response(context=context, prompt=prompt)
+        # Generar y enviar respuesta. La llamada al modelo se ejecuta en un hilo aparte para no
+        # bloquear el servidor de acciones y poder atender (y agrupar) turnos de otras sesiones
+        if self.model_router:
+            # El modelo y la longitud máxima dependen de la intención, la profundidad y las entidades
+            depth = tracker.get_slot("philosophical_depth") or 1
+            route = self.model_router.select_route(intent, entities, depth)
+            generate = functools.partial(self.model_router.generate_response, route, context=context, prompt=prompt)
+        else:
+            generate = functools.partial(self.llama_integration.generate_response, context=context, prompt=prompt)
+        llama_response = await asyncio.get_running_loop().run_in_executor(None, generate)
         response = self._format_response(llama_response, intent) 
         dispatcher.utter_message(text=response)
 
@@ -512,9 +597,9 @@ class ActionRespondToGreeting(LlamaActionAdapter):
     def __init__(self):
         super().__init__(action_name="action_respond_to_greeting")
 
-    def run(self, dispatcher, tracker, domain):
+    async def run(self, dispatcher, tracker, domain):
         is_first_greeting = tracker.get_slot("first_interaction") or True
-        events = super().run(dispatcher, tracker, domain)
+        events = await super().run(dispatcher, tracker, domain)
 
         if is_first_greeting:
             events.append(SlotSet("first_interaction", False))
@@ -0,0 +1,355 @@
+"""
+Benchmark offline de las acciones de Sputnik.
+
+Reproduce conversaciones sintéticas (trackers con historiales largos y un cliente
+LLM simulado) contra LlamaActionAdapter y sus subclases, y mide el tiempo de CPU
+y las asignaciones de memoria por turno de las funciones del camino caliente.
+No necesita Ollama: la latencia del modelo queda fuera de la medición.
+
+Uso:
+    python src/benchmarks/actions_replay.py --output bench_output.json
+    python src/benchmarks/actions_replay.py --baseline bench_output.json --tolerance 0.25
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import platform
+import random
+import statistics
+import sys
+import os
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.actions import (
+    ObjectiveManager,
+    LlamaActionAdapter,
+    ActionRespondToGreeting,
+    ActionRespondToIntroduction,
+    ActionRespondToIdentityQuestion,
+    ActionRespondToEmotionQuestion,
+    ActionRespondToPhilosophicalQuestion,
+    ActionRespondToHumanConceptExplanation,
+    ActionRespondToBookQuestion,
+    ActionRespondToFallback,
+    ActionEndConversation,
+)
+
+DEFAULT_HISTORY_SIZES = [100, 1000, 5000]
+
+# Turnos sintéticos: (intent, entidades, mensaje del usuario)
+SYNTHETIC_TURNS = [
+    ("greet", [], "Hola, buenos días"),
+    ("introduce_yourself", [{"entity": "personal_information", "value": "nombre"}], "Hola, me llamo Lucía y soy investigadora"),
+    ("ask_about_identity", [], "¿Sabes quién eres y para qué te crearon?"),
+    ("ask_about_books", [{"entity": "book_information", "value": "libro"}], "¿Qué libro estás leyendo?"),
+    ("ask_about_emotions", [{"entity": "emotion_type", "value": "tristeza"}], "¿Alguna vez has sentido tristeza?"),
+    ("ask_philosophical_question", [{"entity": "human_concept", "value": "muerte"}], "¿Qué opinas sobre la muerte?"),
+    ("explain_human_concept", [{"entity": "human_concept", "value": "amor"}], "El amor es querer el bien del otro"),
+    ("nlu_fallback", [], "asdf qwerty"),
+]
+
+# Respuestas simuladas con palabras clave que activan _extract_revealed_info
+STUB_RESPONSES = [
+    "Sputnik: *Sputnik levanta la vista* Soy Sputnik, una inteligencia artificial creado para comprender la naturaleza humana. Human:",
+    "*Sputnik cierra el libro* Este libro me ayuda a entender a los humanos; aprendo de la literatura que he leído.",
+    "No siento las emociones como vosotros, pero me intriga qué significa sentir. Las emociones humanas son un misterio.",
+    "La muerte, la consciencia y mi existencia son preguntas que me acompañan. ¿Cuál es el sentido de la vida para ti?",
+    "Sputnik: Es fascinante lo que dices.",
+]
+
+
+class StubLlamaIntegration:
+    """
+    Cliente LLM simulado con la misma interfaz que LlamaIntegration, sin llamadas HTTP
+    """
+
+    def __init__(self, seed: int = 0):
+        self._random = random.Random(seed)
+        self.calls = 0
+
+    def generate_response(self, context: List[str], prompt: str) -> str:
+        self.calls += 1
+        return self._random.choice(STUB_RESPONSES)
+
+    def is_available(self) -> bool:
+        return True
+
+
+class InlineExecutor(concurrent.futures.ThreadPoolExecutor):
+    """
+    Executor que ejecuta las tareas en el propio hilo que las envía. Se usa como executor
+    por defecto del bucle del benchmark para que run() no incluya el salto entre hilos de
+    run_in_executor, que con el cliente simulado dominaría la medición
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def build_events(history_size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Genera un historial sintético de eventos alternando mensajes de usuario, acciones,
+    slots y mensajes del bot, como lo haría el tracker real
+    """
+    rng = random.Random(seed)
+    events = []
+    timestamp = 1700000000.0
+    while len(events) < history_size:
+        intent, entities, text = rng.choice(SYNTHETIC_TURNS)
+        events.append({
+            "event": "user",
+            "timestamp": timestamp,
+            "text": text,
+            "parse_data": {"intent": {"name": intent, "confidence": 0.9}, "entities": entities},
+        })
+        events.append({"event": "action", "timestamp": timestamp, "name": "action_listen"})
+        events.append({"event": "slot", "timestamp": timestamp, "name": "interaction_count", "value": 1})
+        events.append({"event": "bot", "timestamp": timestamp, "text": rng.choice(STUB_RESPONSES), "data": {}})
+        timestamp += 1.0
+    return events[:history_size]
+
+
+def build_tracker(history_size: int, intent: str, entities: List[Dict], user_message: str,
+                  seed: int = 0, discovered_info: Optional[List[str]] = None) -> Tracker:
+    """
+    Construye un Tracker sintético con el historial y el último mensaje indicados
+    """
+    slots = {
+        "human_name": "Lucía",
+        "first_interaction": False,
+        "philosophical_depth": 5.0,
+        "discovered_info": discovered_info or ["identity_revealed", "favorite_books", "death_concept"],
+        "interaction_count": 3,
+    }
+    latest_message = {
+        "intent": {"name": intent, "confidence": 0.9},
+        "entities": entities,
+        "text": user_message,
+    }
+    return Tracker(
+        sender_id=f"bench-{history_size}-{seed}",
+        slots=slots,
+        latest_message=latest_message,
+        events=build_events(history_size, seed),
+        paused=False,
+        followup_action=None,
+        active_loop={},
+        latest_action_name="action_listen",
+    )
+
+
+def stub_action(action: LlamaActionAdapter, seed: int = 0) -> LlamaActionAdapter:
+    """
+    Sustituye el cliente LLM de la acción por el simulado y desactiva el router de modelos
+    """
+    action.llama_integration = StubLlamaIntegration(seed)
+    action.model_router = None
+    return action
+
+
+def build_actions(seed: int = 0) -> Dict[str, Any]:
+    """
+    Instancia las acciones con el cliente LLM simulado
+    """
+    action_classes = {
+        "greet": ActionRespondToGreeting,
+        "introduce_yourself": ActionRespondToIntroduction,
+        "ask_about_identity": ActionRespondToIdentityQuestion,
+        "ask_about_emotions": ActionRespondToEmotionQuestion,
+        "ask_philosophical_question": ActionRespondToPhilosophicalQuestion,
+        "explain_human_concept": ActionRespondToHumanConceptExplanation,
+        "ask_about_books": ActionRespondToBookQuestion,
+        "nlu_fallback": ActionRespondToFallback,
+    }
+    actions = {}
+    for intent, action_class in action_classes.items():
+        actions[intent] = stub_action(action_class(), seed)
+    return actions
+
+
+def measure(func: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    """
+    Mide el tiempo de CPU por llamada (sin tracemalloc activo) y, en una pasada
+    aparte, el pico de memoria asignada por llamada
+    """
+    func()  # Calentamiento
+
+    samples = []
+    for _ in range(iterations):
+        start = time.process_time_ns()
+        func()
+        samples.append(time.process_time_ns() - start)
+
+    alloc_iterations = max(1, iterations // 10)
+    peaks = []
+    tracemalloc.start()
+    for _ in range(alloc_iterations):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - current)
+    tracemalloc.stop()
+
+    samples_us = [s / 1000.0 for s in samples]
+    samples_us.sort()
+    return {
+        "iterations": iterations,
+        "cpu_us_mean": statistics.fmean(samples_us),
+        "cpu_us_median": statistics.median(samples_us),
+        "cpu_us_p95": samples_us[min(len(samples_us) - 1, int(len(samples_us) * 0.95))],
+        "peak_alloc_bytes_mean": statistics.fmean(peaks),
+        "peak_alloc_bytes_max": max(peaks),
+    }
+
+
+def run_benchmarks(history_sizes: List[int], iterations: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Ejecuta todas las mediciones y devuelve los resultados en formato serializable
+    """
+    random.seed(seed)  # _format_response y las despedidas usan random.choice
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(InlineExecutor())
+    actions = build_actions(seed)
+    adapter = stub_action(LlamaActionAdapter(action_name="llama_action_adapter"), seed)
+    objective_manager = ObjectiveManager()
+    results = []
+
+    for history_size in history_sizes:
+        # Métodos comunes de LlamaActionAdapter: no dependen de la subclase, se miden una vez
+        intent, entities, user_message = "ask_philosophical_question", [{"entity": "human_concept", "value": "muerte"}], "¿Qué opinas sobre la muerte?"
+        tracker = build_tracker(history_size, intent, entities, user_message, seed)
+        adapter_cases = {
+            "build_conversation_context": lambda: adapter.build_conversation_context(tracker),
+            "_extract_revealed_info": lambda: adapter._extract_revealed_info(intent, entities, STUB_RESPONSES[0], user_message),
+            "_format_response": lambda: adapter._format_response(STUB_RESPONSES[4], intent),
+        }
+        for case_name, func in adapter_cases.items():
+            results.append({
+                "name": f"LlamaActionAdapter.{case_name}",
+                "intent": intent,
+                "history_size": history_size,
+                **measure(func, iterations),
+            })
+
+        # Métodos que cada acción puede redefinir
+        for intent, entities, user_message in SYNTHETIC_TURNS:
+            tracker = build_tracker(history_size, intent, entities, user_message, seed)
+            action = actions[intent]
+            cases = {
+                "create_prompt": lambda: action.create_prompt(intent, entities, user_message, tracker),
+                "run": lambda: loop.run_until_complete(action.run(CollectingDispatcher(), tracker, {})),
+            }
+            for case_name, func in cases.items():
+                stats = measure(func, iterations)
+                results.append({
+                    "name": f"{action.name()}.{case_name}",
+                    "intent": intent,
+                    "history_size": history_size,
+                    **stats,
+                })
+
+        discovered = build_tracker(history_size, "greet", [], "", seed).get_slot("discovered_info")
+        results.append({
+            "name": "ObjectiveManager.check_completion",
+            "intent": None,
+            "history_size": history_size,
+            **measure(lambda: objective_manager.check_completion(discovered), iterations),
+        })
+
+        end_tracker = build_tracker(history_size, "greet", [], "", seed)
+        end_action = ActionEndConversation()
+        results.append({
+            "name": "action_end_conversation.run",
+            "intent": None,
+            "history_size": history_size,
+            **measure(lambda: end_action.run(CollectingDispatcher(), end_tracker, {}), iterations),
+        })
+
+    loop.close()
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "iterations": iterations,
+        "history_sizes": history_sizes,
+        "results": results,
+    }
+
+
+def compare_with_baseline(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+                          run_tolerance: Optional[float] = None) -> List[str]:
+    """
+    Compara la mediana de CPU de cada caso con la del baseline y devuelve las regresiones.
+    Los casos ".run" incluyen el paso por el bucle de eventos y pueden usar una tolerancia propia
+    """
+    if run_tolerance is None:
+        run_tolerance = tolerance
+
+    baseline_index = {(r["name"], r["history_size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_index.get((result["name"], result["history_size"]))
+        if not previous or previous["cpu_us_median"] <= 0:
+            continue
+        ratio = result["cpu_us_median"] / previous["cpu_us_median"]
+        case_tolerance = run_tolerance if result["name"].endswith(".run") else tolerance
+        if ratio > 1 + case_tolerance:
+            regressions.append(
+                f"{result['name']} (historial {result['history_size']}): "
+                f"{previous['cpu_us_median']:.1f}us -> {result['cpu_us_median']:.1f}us (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline de las acciones de Sputnik")
+    parser.add_argument("--history-sizes", type=int, nargs="+", default=DEFAULT_HISTORY_SIZES,
+                        help="Tamaños de historial de eventos a simular")
+    parser.add_argument("--iterations", type=int, default=200, help="Repeticiones por caso")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Ruta del fichero JSON de resultados (por defecto, stdout)")
+    parser.add_argument("--baseline", help="Fichero JSON de resultados previos con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Aumento relativo máximo de la mediana de CPU antes de considerarlo regresión")
+    parser.add_argument("--run-tolerance", type=float, default=0.5,
+                        help="Tolerancia para los casos .run, que incluyen el coste del bucle de eventos")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.history_sizes, args.iterations, args.seed)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.tolerance, args.run_tolerance)
+        for regression in regressions:
+            print(f"REGRESIÓN: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Comprobación offline del router de modelos.
+
+Levanta un servidor HTTP local que imita las APIs de Ollama (/api/generate) y de un
+servidor compatible con OpenAI (/v1/completions), lanza turnos concurrentes por las
+tres rutas del router con cada backend y verifica que el modelo y el límite de tokens
+de cada ruta llegan a las peticiones. Devuelve código 1 si alguna ruta no se respeta.
+
+Uso:
+    python src/checks/router_payload_check.py
+"""
+
+import json
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ollama_integration import LlamaIntegration
+from models.batched_integration import BatchedLlamaIntegration
+from models.model_router import ModelRouter
+
+TURNS_PER_ROUTE = 3
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    """
+    Responde como Ollama o como un servidor compatible con OpenAI y guarda cada petición
+    """
+
+    payloads: List[Tuple[str, Dict[str, Any]]] = []
+    payloads_lock = threading.Lock()
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.payloads_lock:
+            self.payloads.append((self.path, payload))
+
+        if self.path == "/api/generate":
+            body = {"response": "*asiente* De acuerdo.", "prompt_eval_count": 10, "eval_count": 5}
+        else:
+            body = {"choices": [{"index": i, "text": "*asiente* De acuerdo."} for i in range(len(payload["prompt"]))]}
+
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def sent_limits(path: str, payload: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """
+    Devuelve (modelo, límite de tokens) por cada prompt incluido en la petición
+    """
+    if path == "/api/generate":
+        return [(payload["model"], payload["options"]["num_predict"])]
+    return [(payload["model"], payload["max_tokens"])] * len(payload["prompt"])
+
+
+def check_backend(backend: str, port: int) -> List[str]:
+    """
+    Ejecuta turnos concurrentes por todas las rutas con el backend indicado y devuelve
+    los errores encontrados
+    """
+    def factory(model_name: str, max_tokens: int) -> LlamaIntegration:
+        if backend == "batched":
+            return BatchedLlamaIntegration(port=port, model_name=model_name, max_tokens=max_tokens,
+                                           batch_window_ms=20)
+        return LlamaIntegration(port=port, model_name=model_name, max_tokens=max_tokens)
+
+    router = ModelRouter(integration_factory=factory, light_model="small", full_model="big")
+    RecordingHandler.payloads.clear()
+
+    threads = [
+        threading.Thread(target=router.generate_response, args=(route_name, [], f"turno {i}"))
+        for route_name in router.routes
+        for i in range(TURNS_PER_ROUTE)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    sent = []
+    for path, payload in RecordingHandler.payloads:
+        sent.extend(sent_limits(path, payload))
+
+    errors = []
+    for route_name, route in router.routes.items():
+        expected = (route["model_name"], route["max_tokens"])
+        count = sent.count(expected)
+        if count != TURNS_PER_ROUTE:
+            errors.append(f"[{backend}] ruta '{route_name}': se esperaban {TURNS_PER_ROUTE} prompts "
+                          f"con {expected}, se enviaron {count} (enviado: {sorted(sent)})")
+
+    metrics = router.get_metrics()["routes"]
+    for route_name, route_metrics in metrics.items():
+        if route_metrics["failures"]:
+            errors.append(f"[{backend}] ruta '{route_name}': {route_metrics['failures']} generaciones fallidas")
+
+    return errors
+
+
+def main() -> int:
+    server = ThreadingHTTPServer(("localhost", 0), RecordingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    errors = []
+    try:
+        for backend in ["ollama", "batched"]:
+            errors.extend(check_backend(backend, port))
+    finally:
+        server.shutdown()
+
+    for error in errors:
+        print(f"ERROR: {error}", file=sys.stderr)
+    if errors:
+        return 1
+
+    print("Cada ruta envía su modelo y su límite de tokens con ambos backends")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
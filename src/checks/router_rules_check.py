@@ -0,0 +1,90 @@
+"""
+Comprobación offline de las reglas de enrutado de ModelRouter.select_route.
+
+Verifica los límites de profundidad entre rutas, el efecto de las entidades
+reflexivas, las intenciones que no son filosóficas a gran profundidad y las
+intenciones ligeras con profundidad alta. No hace llamadas HTTP. Devuelve
+código 1 si alguna regla no se cumple.
+
+Uso:
+    python src/checks/router_rules_check.py
+"""
+
+import sys
+import os
+from typing import Any, Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.ollama_integration import LlamaIntegration
+from models.model_router import ModelRouter
+
+HUMAN_CONCEPT = [{"entity": "human_concept", "value": "muerte"}]
+EMOTION_TYPE = [{"entity": "emotion_type", "value": "tristeza"}]
+BOOK_INFORMATION = [{"entity": "book_information", "value": "libro"}]
+
+# (descripción, intención, entidades, profundidad, ruta esperada) con los umbrales por defecto (3 y 7)
+CASES: List[Tuple[str, str, List[Dict[str, Any]], float, str]] = [
+    # Límite entre las rutas ligera y estándar (profundidad 3/4)
+    ("profundidad 3 sin entidades", "ask_about_books", [], 3.0, "light"),
+    ("profundidad 4 sin entidades", "ask_about_books", [], 4.0, "standard"),
+    ("pregunta filosófica a profundidad 3", "ask_philosophical_question", [], 3.0, "light"),
+    ("pregunta filosófica a profundidad 4", "ask_philosophical_question", [], 4.0, "standard"),
+
+    # Límite entre las rutas estándar y profunda (profundidad 6/7)
+    ("pregunta filosófica a profundidad 6", "ask_philosophical_question", [], 6.0, "standard"),
+    ("pregunta filosófica a profundidad 7", "ask_philosophical_question", [], 7.0, "deep"),
+    ("identidad a profundidad 6", "ask_about_identity", [], 6.0, "standard"),
+    ("identidad a profundidad 7", "ask_about_identity", [], 7.0, "deep"),
+    ("emociones a profundidad 7", "ask_about_emotions", EMOTION_TYPE, 7.0, "deep"),
+
+    # Las entidades human_concept y emotion_type mantienen el turno fuera de la ruta ligera
+    ("saludo con human_concept", "greet", HUMAN_CONCEPT, 1.0, "standard"),
+    ("presentación con emotion_type", "introduce_yourself", EMOTION_TYPE, 1.0, "standard"),
+    ("libros con human_concept a profundidad 1", "ask_about_books", HUMAN_CONCEPT, 1.0, "standard"),
+    ("emociones con emotion_type a profundidad 2", "ask_about_emotions", EMOTION_TYPE, 2.0, "standard"),
+    ("libros con book_information a profundidad 1", "ask_about_books", BOOK_INFORMATION, 1.0, "light"),
+
+    # Intenciones que no son filosóficas a profundidad alta van a la ruta estándar
+    ("libros a profundidad 7", "ask_about_books", [], 7.0, "standard"),
+    ("libros a profundidad 10", "ask_about_books", BOOK_INFORMATION, 10.0, "standard"),
+    ("concepto humano a profundidad 7", "explain_human_concept", HUMAN_CONCEPT, 7.0, "standard"),
+    ("concepto humano sin entidades a profundidad 9", "explain_human_concept", [], 9.0, "standard"),
+
+    # Las intenciones ligeras van a la ruta ligera aunque la profundidad sea alta
+    ("saludo a profundidad 9", "greet", [], 9.0, "light"),
+    ("presentación a profundidad 8", "introduce_yourself", [], 8.0, "light"),
+    ("fallback a profundidad 10", "nlu_fallback", [], 10.0, "light"),
+]
+
+
+def build_router() -> ModelRouter:
+    """
+    Crea un router con integraciones reales que nunca llegan a usarse
+    """
+    return ModelRouter(
+        integration_factory=lambda model_name, max_tokens: LlamaIntegration(model_name=model_name, max_tokens=max_tokens)
+    )
+
+
+def main() -> int:
+    router = build_router()
+
+    errors = []
+    for description, intent, entities, depth, expected in CASES:
+        route = router.select_route(intent, entities, depth)
+        if route != expected:
+            errors.append(f"{description} ({intent}, profundidad {depth}): "
+                          f"se esperaba '{expected}', se obtuvo '{route}'")
+
+    for error in errors:
+        print(f"ERROR: {error}", file=sys.stderr)
+    if errors:
+        return 1
+
+    print(f"Las {len(CASES)} reglas de enrutado se cumplen")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import requests
+import threading
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional
+
+from models.ollama_integration import LlamaIntegration
+
+
+class _PendingGeneration:
+    """
+    Solicitud de generación a la espera de ser enviada dentro de un lote
+    """
+
+    def __init__(self, prompt: str, deadline: float):
+        self.prompt = prompt
+        #Instante (time.monotonic) a partir del cual la acción ya no espera la respuesta
+        self.deadline = deadline
+        self.response: Optional[str] = None
+        self.usage: Dict[str, int] = {}
+        self.failed = False
+        self.done = threading.Event()
+
+    def resolve(self, response: Optional[str], usage: Optional[Dict[str, int]] = None):
+        #Una respuesta None indica que el servidor no ha devuelto nada para este prompt
+        self.response = response
+        self.usage = usage or {}
+        self.failed = response is None
+        self.done.set()
+
+
+class _MicroBatcher:
+    """
+    Agrupa las solicitudes concurrentes que llegan dentro de una pequeña ventana de tiempo
+    y las envía en una sola petición a un servidor compatible con OpenAI (/v1/completions),
+    repartiendo después cada respuesta a la acción que la estaba esperando.
+    """
+
+    def __init__(self, integration: "BatchedLlamaIntegration"):
+        self.integration = integration
+        self.pending: "queue.Queue[_PendingGeneration]" = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=integration.max_in_flight_batches,
+                                           thread_name_prefix="llama-batch")
+        self.worker = threading.Thread(target=self._collect_batches, name="llama-batcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, prompt: str, deadline: float) -> _PendingGeneration:
+        generation = _PendingGeneration(prompt, deadline)
+        self.pending.put(generation)
+        return generation
+
+    def _collect_batches(self):
+        #Bloquea hasta la primera solicitud y después espera la ventana para agrupar las siguientes
+        window = self.integration.batch_window_ms / 1000.0
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + window
+            while len(batch) < self.integration.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.executor.submit(self._send_batch, batch)
+
+    def _send_batch(self, batch: List[_PendingGeneration]):
+        #Descarta las solicitudes cuya acción ya ha dejado de esperar (p. ej. por haber esperado
+        #a que quedase libre un hueco entre los lotes en curso), para no gastar el servidor en ellas
+        now = time.monotonic()
+        expired = [generation for generation in batch if generation.deadline <= now]
+        batch = [generation for generation in batch if generation.deadline > now]
+        for generation in expired:
+            generation.resolve(None)
+        if expired:
+            self.integration.logger.warning(f"Descartadas {len(expired)} solicitudes caducadas antes de enviar el lote")
+        if not batch:
+            return
+
+        #La petición no debe durar más de lo que la última acción del lote está dispuesta a esperar
+        timeout = min(self.integration.timeout, max(generation.deadline for generation in batch) - now)
+        try:
+            results = self.integration._request_batch([generation.prompt for generation in batch], timeout)
+        except Exception as e:
+            self.integration.logger.error(f"Excepción al generar respuesta en lote: {str(e)}")
+            results = [(None, {})] * len(batch)
+
+        for generation, (response, usage) in zip(batch, results):
+            generation.resolve(response, usage)
+
+
+class BatchedLlamaIntegration(LlamaIntegration):
+    """
+    Alternativa a LlamaIntegration para servidores con slots paralelos o continuous batching
+    (llama.cpp server, vLLM, etc.). Las solicitudes de distintas sesiones que coinciden en una
+    ventana de pocos milisegundos se envían juntas en una sola petición.
+
+    El servidor recibe el mismo prompt que se envía a Ollama (historial "Human:"/"Sputnik:"
+    terminado en "Sputnik:"). Como /v1/completions no aplica la plantilla de chat del modelo,
+    se añaden secuencias de parada para que la respuesta termine al final del turno de Sputnik,
+    igual que con el backend de Ollama, en lugar de inventar nuevos turnos de la conversación.
+    """
+
+    stop_sequences = ["\nHuman:", "Human:", "\nSputnik:"]
+
+    error_response = "Lo siento, estoy teniendo problemas para procesar esa información."
+
+    #Un único agrupador por servidor, modelo y parámetros de generación, compartido por todas las
+    #acciones del proceso. Los parámetros forman parte de la clave porque cada lote se envía con
+    #los de la integración que creó el agrupador
+    _batchers: Dict[Tuple[str, str, int, float], _MicroBatcher] = {}
+    _batchers_lock = threading.Lock()
+
+    def __init__(self,
+                 host: str = "http://localhost",
+                 port: int = 8080,
+                 model_name: str = "llama3.1",
+                 temperature: float = 0.7,
+                 max_tokens: int = 200,
+                 batch_window_ms: float = 5.0,
+                 max_batch_size: int = 8,
+                 max_in_flight_batches: int = 4,
+                 timeout: float = 60.0):
+
+        super().__init__(host=host, port=port, model_name=model_name,
+                         temperature=temperature, max_tokens=max_tokens)
+        self.batch_window_ms = batch_window_ms
+        self.max_batch_size = max_batch_size
+        self.max_in_flight_batches = max_in_flight_batches
+        self.timeout = timeout
+
+    def _get_batcher(self) -> _MicroBatcher:
+        key = (self.base_url, self.model_name, self.max_tokens, self.temperature)
+        with self._batchers_lock:
+            batcher = self._batchers.get(key)
+            if batcher is None:
+                batcher = _MicroBatcher(self)
+                self._batchers[key] = batcher
+            return batcher
+
+    def generate_response_with_usage(self, context: List[str], prompt: str) -> Tuple[str, Optional[Dict[str, int]]]:
+        """
+        Genera una respuesta encolando el prompt en el lote actual y esperando su resultado.
+        El servidor solo informa del uso de tokens del lote completo, así que el uso de cada
+        prompt es una estimación (ver _split_usage); queda vacío si el servidor no lo informa.
+        Si la generación falla, devuelve el mensaje de error y None.
+
+        Args:
+            context: Lista de mensajes previos en la conversación
+            prompt: prompt específico para la generación
+
+        Returns:
+            La respuesta generada por el modelo y el uso de tokens
+        """
+        full_prompt = self._build_full_prompt(context, prompt)
+        self.logger.info(f"Encolando solicitud en lote con prompt: {full_prompt[:100]}...")
+
+        #Se espera la ventana de agrupación además del timeout de la petición HTTP
+        wait_timeout = self.batch_window_ms / 1000.0 + self.timeout
+        generation = self._get_batcher().submit(full_prompt, time.monotonic() + wait_timeout)
+        if not generation.done.wait(wait_timeout):
+            self.logger.error("Tiempo de espera agotado al generar respuesta en lote")
+            return self.error_response, None
+
+        if generation.failed:
+            return self.error_response, None
+
+        self.logger.info(f"Respuesta Generada correctamente: {generation.response[:100]}...")
+        return generation.response, generation.usage
+
+    def _request_batch(self, prompts: List[str], timeout: float) -> List[Tuple[Optional[str], Dict[str, int]]]:
+        """
+        Envía varios prompts en una sola petición a /v1/completions y devuelve, en el mismo
+        orden, la respuesta y el uso de tokens estimado de cada uno. Las posiciones sin
+        respuesta se devuelven como None.
+        """
+        api_url = f"{self.base_url}/v1/completions"
+        payload = {
+            "model": self.model_name,
+            "prompt": prompts,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "stop": self.stop_sequences,
+            "stream": False
+        }
+
+        self.logger.info(f"Enviando lote de {len(prompts)} solicitudes a {api_url}")
+        response = requests.post(api_url, json=payload, timeout=timeout)
+
+        if response.status_code != 200:
+            self.logger.error(f"Error al llamar al servidor de lotes: {response.status_code} - {response.text}")
+            return [(None, {})] * len(prompts)
+
+        #Cada choice indica el índice del prompt al que corresponde
+        response_data = response.json()
+        responses: List[Optional[str]] = [None] * len(prompts)
+        for position, choice in enumerate(response_data.get("choices", [])):
+            index = choice.get("index", position)
+            if 0 <= index < len(prompts):
+                responses[index] = choice.get("text", "")
+
+        usages = self._split_usage(response_data.get("usage"), prompts, responses)
+        return list(zip(responses, usages))
+
+    def _split_usage(self, usage: Optional[Dict[str, int]], prompts: List[str],
+                     responses: List[Optional[str]]) -> List[Dict[str, int]]:
+        """
+        Reparte el uso de tokens del lote entre sus prompts, en proporción a la longitud de
+        cada prompt (tokens del prompt) y de cada respuesta (tokens generados)
+        """
+        if not usage or "completion_tokens" not in usage:
+            return [{} for _ in prompts]
+
+        def split(total: int, lengths: List[int]) -> List[int]:
+            total_length = sum(lengths)
+            if not total_length:
+                return [total // len(lengths)] * len(lengths)
+            shares = [round(total * length / total_length) for length in lengths[:-1]]
+            #El último prompt recibe el resto para que el reparto sume exactamente el total
+            return shares + [total - sum(shares)]
+
+        prompt_tokens = split(usage.get("prompt_tokens", 0), [len(prompt) for prompt in prompts])
+        completion_tokens = split(usage["completion_tokens"], [len(response or "") for response in responses])
+        return [
+            {"prompt_tokens": prompt_share, "completion_tokens": completion_share}
+            for prompt_share, completion_share in zip(prompt_tokens, completion_tokens)
+        ]
+
+    def is_available(self) -> bool:
+        """
+        Verifica si el servidor compatible con OpenAI está disponible.
+        Devuelve True si está disponible, False en caso contrario.
+        """
+        try:
+            api_url = f"{self.base_url}/v1/models"
+            response = requests.get(api_url, timeout=5)
+            return response.status_code == 200
+        except Exception as e:
+            self.logger.error(f"Error al verificar disponibilidad del servidor de lotes: {str(e)}")
+            return False
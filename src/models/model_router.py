@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from models.ollama_integration import LlamaIntegration
+
+
+class ModelRouter:
+    """
+    Decide qué modelo y qué ajustes de generación usar en cada turno según la intención,
+    la profundidad filosófica y las entidades detectadas, y recoge métricas de latencia
+    y tokens por ruta para poder ajustar los umbrales.
+    """
+
+    # Intenciones de poco peso en la conversación, que pueden resolverse con un modelo ligero
+    LIGHT_INTENTS = ["greet", "introduce_yourself", "nlu_fallback"]
+
+    # Intenciones que, con suficiente profundidad, merecen el modelo completo
+    DEEP_INTENTS = ["ask_philosophical_question", "ask_about_identity", "ask_about_emotions"]
+
+    # Entidades que elevan la carga reflexiva del turno
+    DEEP_ENTITIES = ["human_concept", "emotion_type"]
+
+    def __init__(self,
+                 integration_factory: Callable[..., LlamaIntegration],
+                 light_model: str = "llama3.2:3b",
+                 light_endpoint: Optional[Dict[str, Any]] = None,
+                 full_model: str = "llama3.1",
+                 light_max_depth: float = 3,
+                 deep_min_depth: float = 7,
+                 metrics_path: Optional[str] = None,
+                 metrics_interval_s: float = 5.0,
+                 latency_window: int = 500):
+
+        self.routes = {
+            "light": {
+                "description": "Saludos, presentaciones, fallback y turnos de profundidad baja",
+                "model_name": light_model,
+                "max_tokens": 120
+            },
+            "standard": {
+                "description": "Turnos de profundidad intermedia",
+                "model_name": full_model,
+                "max_tokens": 200
+            },
+            "deep": {
+                "description": "Turnos filosóficos de profundidad alta",
+                "model_name": full_model,
+                "max_tokens": 300
+            }
+        }
+        self.light_max_depth = light_max_depth
+        self.deep_min_depth = deep_min_depth
+        self.metrics_path = metrics_path
+        self.metrics_interval_s = metrics_interval_s
+        self.logger = logging.getLogger(__name__)
+
+        # light_endpoint (host/port) permite servir el modelo ligero desde otro servidor
+        self.endpoints = {"light": light_endpoint or {}}
+
+        self.integrations = {
+            route_name: integration_factory(model_name=route["model_name"], max_tokens=route["max_tokens"],
+                                            **self.endpoints.get(route_name, {}))
+            for route_name, route in self.routes.items()
+        }
+
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._last_export = 0.0
+        self._metrics = {
+            route_name: {
+                "requests": 0,
+                "failures": 0,
+                "token_requests": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "token_latency_ms": 0.0,
+                "total_latency_ms": 0.0,
+                "latencies_ms": deque(maxlen=latency_window)
+            }
+            for route_name in self.routes
+        }
+
+    def select_route(self, intent: str, entities: List[Dict[str, Any]], depth: float) -> str:
+        """
+        Devuelve el nombre de la ruta para el turno actual
+        """
+        entity_types = {entity.get('entity') for entity in entities}
+        has_deep_entities = any(entity_type in entity_types for entity_type in self.DEEP_ENTITIES)
+
+        if intent in self.DEEP_INTENTS and depth >= self.deep_min_depth:
+            return "deep"
+
+        if intent in self.LIGHT_INTENTS and not has_deep_entities:
+            return "light"
+
+        if depth <= self.light_max_depth and not has_deep_entities:
+            return "light"
+
+        return "standard"
+
+    def generate_response(self, route_name: str, context: List[str], prompt: str) -> str:
+        """
+        Genera la respuesta con la integración de la ruta indicada y registra sus métricas.
+        Las generaciones fallidas se cuentan aparte y no entran en las latencias
+        """
+        start = time.perf_counter()
+        response, usage = self.integrations[route_name].generate_response_with_usage(context, prompt)
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        if usage is None:
+            self._record_failure(route_name)
+            self.logger.warning(f"Ruta '{route_name}' ({self.routes[route_name]['model_name']}): "
+                                f"generación fallida tras {latency_ms:.0f} ms")
+        else:
+            self._record(route_name, latency_ms, usage)
+            self.logger.info(f"Ruta '{route_name}' ({self.routes[route_name]['model_name']}): "
+                             f"{latency_ms:.0f} ms, {usage.get('completion_tokens', 'n/d')} tokens generados")
+
+        if self.metrics_path and time.monotonic() - self._last_export >= self.metrics_interval_s:
+            self.export_metrics(self.metrics_path)
+
+        return response
+
+    def _record_failure(self, route_name: str):
+        with self._lock:
+            self._metrics[route_name]["failures"] += 1
+
+    def _record(self, route_name: str, latency_ms: float, usage: Dict[str, int]):
+        with self._lock:
+            metrics = self._metrics[route_name]
+            metrics["requests"] += 1
+            #Solo se suman los tokens de las peticiones en las que el backend los informa
+            if "completion_tokens" in usage:
+                metrics["token_requests"] += 1
+                metrics["prompt_tokens"] += usage.get("prompt_tokens", 0)
+                metrics["completion_tokens"] += usage["completion_tokens"]
+                metrics["token_latency_ms"] += latency_ms
+            metrics["total_latency_ms"] += latency_ms
+            metrics["latencies_ms"].append(latency_ms)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Devuelve un resumen de las métricas por ruta: número de peticiones correctas y fallidas,
+        latencias (media, p50, p95 y máxima sobre las últimas peticiones correctas) y tokens.
+        Los campos de tokens valen None si ninguna petición de la ruta los ha informado
+        """
+        summary = {
+            "thresholds": {
+                "light_max_depth": self.light_max_depth,
+                "deep_min_depth": self.deep_min_depth
+            },
+            "routes": {}
+        }
+
+        with self._lock:
+            for route_name, metrics in self._metrics.items():
+                latencies = sorted(metrics["latencies_ms"])
+                requests = metrics["requests"]
+                has_tokens = metrics["token_requests"] > 0
+                token_seconds = metrics["token_latency_ms"] / 1000
+
+                summary["routes"][route_name] = {
+                    "model_name": self.routes[route_name]["model_name"],
+                    "max_tokens": self.routes[route_name]["max_tokens"],
+                    "requests": requests,
+                    "failures": metrics["failures"],
+                    "latency_ms_mean": metrics["total_latency_ms"] / requests if requests else 0.0,
+                    "latency_ms_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+                    "latency_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+                    "latency_ms_max": latencies[-1] if latencies else 0.0,
+                    "token_requests": metrics["token_requests"],
+                    "prompt_tokens": metrics["prompt_tokens"] if has_tokens else None,
+                    "completion_tokens": metrics["completion_tokens"] if has_tokens else None,
+                    "completion_tokens_per_second": (
+                        metrics["completion_tokens"] / token_seconds if token_seconds else 0.0
+                    ) if has_tokens else None
+                }
+
+        return summary
+
+    def export_metrics(self, path: str):
+        """
+        Escribe el resumen de métricas en un fichero JSON. Se escribe primero en un fichero
+        temporal y después se sustituye el original, para que nunca quede a medio escribir
+        """
+        try:
+            with self._export_lock:
+                self._last_export = time.monotonic()
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.get_metrics(), f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, path)
+        except Exception as e:
+            self.logger.error(f"Error al exportar las métricas del router: {str(e)}")
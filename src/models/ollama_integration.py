@@ -1,7 +1,7 @@
 import requests
 import json
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 class LlamaIntegration:
 
@@ -10,7 +10,7 @@ class LlamaIntegration:
                   port: int = 11434,
                   model_name: str = "llama3.1",
                   temperature: float = 0.7,
-                  max_tokens: int = 200):
+                  max_tokens: Optional[int] = 200):
         
         self.base_url = f"{host}:{port}"
         self.model_name = model_name
@@ -34,25 +34,33 @@ class LlamaIntegration:
         Returns:
             La respuesta generada por el modelo
         """
+        return self.generate_response_with_usage(context, prompt)[0]
+
+    def generate_response_with_usage(self, context: List[str], prompt: str) -> Tuple[str, Optional[Dict[str, int]]]:
+        """
+        Igual que generate_response, pero devuelve además el número de tokens del prompt
+        ("prompt_tokens") y de la respuesta ("completion_tokens") que informa Ollama.
+        Si la generación falla, devuelve el mensaje de error y None en lugar del uso.
+        """
 
         try:
             #Para construir la URL para la API de Ollama
             api_url = f"{self.base_url}/api/generate"
 
-            #Construit el historial de mensajes para Llama 3
-            conversation_history = "\n".join(context) if context else ""
-
-            #El prompt final es el historial de la conversación más el prompt específico
-            full_prompt = f"{conversation_history}\n{prompt}\nSputnik:"
+            full_prompt = self._build_full_prompt(context, prompt)
 
             #Esto prepara los parámetros para la solicitud
             payload = {
                 "model": self.model_name,
                 "prompt": full_prompt,
-                "temperature": self.temperature,
-                "max_tokens": self.max_tokens,
+                "options": {
+                    "temperature": self.temperature
+                },
                 "stream": False
             }
+            #Sin max_tokens no se limita la longitud de la respuesta (valor por defecto de Ollama)
+            if self.max_tokens is not None:
+                payload["options"]["num_predict"] = self.max_tokens
 
             self.logger.info(f"Enviando solicitud a Ollama con prompt: {full_prompt[:100]}...") # Loguea solo los primeros 100 caracteres del prompt
 
@@ -64,15 +72,29 @@ class LlamaIntegration:
                 response_data = response.json()
                 generated_text = response_data.get("response", "")
                 self.logger.info(f"Respuesta Generada correctamente: {generated_text[:100]}...")
+                usage = {
+                    "prompt_tokens": response_data.get("prompt_eval_count", 0),
+                    "completion_tokens": response_data.get("eval_count", 0)
+                }
                 #Devuelve el texto generado por el modelo
-                return generated_text
+                return generated_text, usage
             else:
                 self.logger.error(f"Error al llamar a Ollama: {response.status_code} - {response.text}")
-                return "Lo siento, estoy teniendo problemas para procesar esa información."
+                return "Lo siento, estoy teniendo problemas para procesar esa información.", None
             
         except Exception as e:
             self.logger.error(f"Excepción al generar respuesta: {str(e)}")
-            return "Lo siento, estoy teniendo problemas para procesar esa información."
+            return "Lo siento, estoy teniendo problemas para procesar esa información.", None
+
+    def _build_full_prompt(self, context: List[str], prompt: str) -> str:
+        """
+        Construye el prompt final a partir del historial de la conversación y del prompt específico
+        """
+        #Construit el historial de mensajes para Llama 3
+        conversation_history = "\n".join(context) if context else ""
+
+        #El prompt final es el historial de la conversación más el prompt específico
+        return f"{conversation_history}\n{prompt}\nSputnik:"
 
     def is_available(self) -> bool:
         """